@@ -1,12 +1,20 @@
-from operator import attrgetter, itemgetter
+from operator import attrgetter
+import hashlib
+import json
 import os
 import re
 from collections import defaultdict
 import sys
-import inspect
+import time
 
-from flask import current_app, render_template, render_template_string
-from jinja2 import evalcontextfilter
+from flask import abort, current_app, g, render_template, request
+from jinja2 import BytecodeCache, ChoiceLoader, FileSystemBytecodeCache, \
+    FileSystemLoader, PrefixLoader, evalcontextfilter
+from werkzeug.http import is_resource_modified
+
+from .cache import SharedCache
+from .profiling import EndpointProfiler, unwrap
+from .stats import UsageStats
 
 
 try:
@@ -20,17 +28,45 @@ if sys.version < '3':
 else:
     get_function_code = attrgetter('__code__')
 
+timer = getattr(time, 'perf_counter', time.time)
+
+try:
+    _intern = intern
+except NameError:
+    _intern = sys.intern
+
+try:
+    from types import MappingProxyType as _frozendict
+except ImportError:
+    _frozendict = dict
+
 
 class Autodoc(object):
 
-    def __init__(self, app=None):
+    def __init__(self, app=None, shared_cache=None, stats=False,
+                 bytecode_cache=None, max_size=None):
         self.app = app
+        self.max_size = max_size
+        self.shared_cache = SharedCache(shared_cache) if shared_cache \
+            else None
+        if bytecode_cache is None or \
+                isinstance(bytecode_cache, BytecodeCache):
+            self.bytecode_cache = bytecode_cache
+        else:
+            self.bytecode_cache = FileSystemBytecodeCache(bytecode_cache)
+        self._jinja_envs = {}
+        self.stats = UsageStats() if stats else None
+        self.profilers = {}
         self.func_groups = defaultdict(set)
         self.func_props = defaultdict()
         self.immutable_props = ['rule', 'endpoint']
         self.default_props = ['methods', 'docstring', 
             'args', 'defaults', 'location'] + self.immutable_props
-        self.func_locations = defaultdict(dict)
+        self.func_locations = defaultdict(tuple)
+        self.func_max_sizes = {}
+        self._interned = {}
+        self._revision = 0
+        self._model = None
         if app is not None:
             self.init_app(app)
 
@@ -40,10 +76,25 @@ class Autodoc(object):
         else:
             app.teardown_request(self.teardown)
         self.add_custom_template_filters(app)
+        if self.stats is not None:
+            app.before_request(self._start_timer)
+            app.after_request(self._record_request)
+        if hasattr(app, 'cli'):
+            from .cli import make_cli
+            app.cli.add_command(make_cli(self), 'autodoc')
 
     def teardown(self, exception):
         ctx = stack.top
 
+    def _start_timer(self):
+        g._autodoc_start = timer()
+
+    def _record_request(self, response):
+        start = getattr(g, '_autodoc_start', None)
+        if start is not None and request.endpoint is not None:
+            self.stats.record(request.endpoint, timer() - start)
+        return response
+
     def add_custom_template_filters(self, app):
         """Add custom filters to jinja2 templating engine"""
         self.add_custom_nl2br_filters(app)
@@ -61,7 +112,8 @@ class Autodoc(object):
                                  for p in _paragraph_re.split(value))
             return result
 
-    def doc(self, groups=None, set_location=True, **properties):
+    def doc(self, groups=None, set_location=True, max_size=None,
+            **properties):
         """Add flask route to autodoc for automatic documentation
 
         Any route decorated with this method will be added to the list of
@@ -82,35 +134,140 @@ class Autodoc(object):
 
         If a parameter is passed in with a name that is already in the dict, but
         not of a reserved name, the passed parameter overrides that dict value.
+
+        max_size overrides the max_size given to the constructor for this
+        route (refer to generate()).
         """
         def decorator(f):
-            # Get previous group list (if any)
-            if f in self.func_groups:
-                groupset = self.func_groups[f]
-            else:
-                groupset = set()
-
-            # Set group[s]
-            if type(groups) is list:
-                groupset.update(groups)
-            elif type(groups) is str:
-                groupset.add(groups)
-            groupset.add('all')
-            self.func_groups[f] = groupset
-            self.func_props[f] = properties
-
-            # Set location
-            if set_location:
-                caller_frame = inspect.stack()[1]
-                self.func_locations[f] = {
-                        'filename': caller_frame[1],
-                        'line':     caller_frame[2],
-                        }
-
+            location = _location(sys._getframe(1)) if set_location else None
+            self._register([f], groups, properties, location, max_size)
             return f
         return decorator
 
-    def generate(self, groups='all', sort=None):
+    def register_many(self, views, groups=None, set_location=True,
+                      max_size=None, **properties):
+        """Add many routes to autodoc at once, as if each of their view
+        functions was decorated with doc(groups, **properties)
+
+        views may contain view functions or endpoint names of the app. All
+        the routes share the same group set and properties, and a single
+        location: the one of the caller of register_many(), if set_location
+        is True.
+        """
+        app = self.app if self.app is not None else current_app
+        funcs = [unwrap(app.view_functions[view] if isinstance(view, str)
+                        else view)
+                 for view in views]
+        location = _location(sys._getframe(1)) if set_location else None
+        self._register(funcs, groups, properties, location, max_size)
+
+    def document_blueprint(self, blueprint, groups=None, set_location=True,
+                           max_size=None, **properties):
+        """Add all the routes of a blueprint to autodoc (refer to
+        register_many())
+
+        The routes are added when the blueprint is registered on an app, so
+        this must be called after the routes are defined and before the
+        blueprint is registered. Like the 'static' endpoint of the app, the
+        one of the blueprint is not documented.
+        """
+        location = _location(sys._getframe(1)) if set_location else None
+        prefix = blueprint.name + '.'
+
+        def register(state):
+            funcs = [unwrap(func)
+                     for endpoint, func in state.app.view_functions.items()
+                     if endpoint.startswith(prefix) and
+                     endpoint != prefix + 'static']
+            self._register(funcs, groups, properties, location, max_size)
+        blueprint.record(register)
+
+    def _register(self, funcs, groups, properties, location, max_size):
+        """Add funcs to groups (and 'all') and set their properties,
+        location and max_size
+
+        Group names, group sets, properties and locations are interned, so
+        that functions documented the same way share the same objects.
+        """
+        new_groups = set(['all'])
+        if type(groups) is list:
+            new_groups.update(groups)
+        elif type(groups) is str:
+            new_groups.add(groups)
+        new_groups = self._intern_groups(new_groups)
+        properties = self._intern_props(properties)
+        if location is not None:
+            location = self._intern_location(location)
+
+        for f in funcs:
+            if f in self.func_groups:
+                self.func_groups[f] = self._intern_groups(
+                    self.func_groups[f] | new_groups)
+            else:
+                self.func_groups[f] = new_groups
+            self.func_props[f] = properties
+            if location is not None:
+                self.func_locations[f] = location
+            if max_size is not None:
+                self.func_max_sizes[f] = max_size
+        self._revision += 1
+
+    def _intern_groups(self, groups):
+        """Return the shared frozenset of the (interned) group names"""
+        groups = frozenset(_intern(g) if type(g) is str else g
+                           for g in groups)
+        return self._interned.setdefault(('groups', groups), groups)
+
+    def _intern_props(self, properties):
+        """Return a shared read-only copy of properties
+
+        Properties whose values cannot be compared (refer to _freeze()) are
+        not shared, only made read-only.
+        """
+        try:
+            key = ('props', _freeze(properties))
+        except TypeError:
+            return _frozendict(properties)
+        if key not in self._interned:
+            self._interned[key] = _frozendict(properties)
+        return self._interned[key]
+
+    def _intern_location(self, location):
+        """Return the shared (filename, line) tuple of location"""
+        filename, line = location
+        location = (_intern(filename) if type(filename) is str else filename,
+                    line)
+        return self._interned.setdefault(('location', location), location)
+
+    def memory_stats(self):
+        """Return a dict describing the memory used to store the documented
+        functions:
+         - functions: the number of documented functions
+         - groups: the number of distinct group names
+         - group_sets: the number of distinct group sets
+         - properties: the number of distinct property maps
+         - locations: the number of distinct locations
+         - bytes: an estimate of the size of the registries and of the
+           objects listed above, as given by sys.getsizeof()
+        """
+        group_sets = _distinct(self.func_groups.values())
+        properties = _distinct(self.func_props.values())
+        locations = _distinct(self.func_locations.values())
+        groups = _distinct(g for groupset in group_sets for g in groupset)
+        size = sum(sys.getsizeof(registry) for registry in (
+            self.func_groups, self.func_props, self.func_locations))
+        size += sum(sys.getsizeof(o) for o in group_sets + locations + groups)
+        size += sum(sys.getsizeof(dict(p)) for p in properties)
+        return {
+            'functions': len(set(self.func_groups) | set(self.func_props)),
+            'groups': len(groups),
+            'group_sets': len(group_sets),
+            'properties': len(properties),
+            'locations': len(locations),
+            'bytes': size,
+        }
+
+    def generate(self, groups='all', sort=None, truncate=True):
         """Return a list of dict describing the routes specified by the
         doc() method
 
@@ -125,7 +282,26 @@ class Autodoc(object):
         By specifying the group or groups arguments, only routes belonging to
         those groups will be returned.
 
-        Routes are sorted alphabetically based on the rule.
+        Routes are sorted alphabetically based on the rule. Another order can
+        be chosen by passing one of the names in SORT_KEYS ('rule',
+        'endpoint', 'methods', 'group' or 'location') as sort; these orders
+        are computed once and reused until the routes change. sort may also
+        be a function taking the list of dicts and returning it sorted.
+
+        If the Autodoc was created with stats=True, each dict also contains
+        the usage of its endpoint since the app started (refer to
+        UsageStats.summary()):
+         - hits: the number of requests
+         - latency: the mean time to handle them, in milliseconds
+         - histogram: the distribution of that time
+        and the routes can also be sorted by 'hits' or 'latency', highest
+        first.
+
+        If the Autodoc was created with a max_size, or the route documented
+        with one, docstrings and string properties longer than max_size
+        characters are cut to that size, unless truncate is False. The names
+        of the fields that were cut are then listed in 'truncated'.
+        budget_report() lists them all, and detail() returns the full text.
         """
         groups_to_generate = list()
         if type(groups) is list:
@@ -133,39 +309,267 @@ class Autodoc(object):
         elif type(groups) is str:
             groups_to_generate.append(groups)
 
-        links = []
-        for rule in current_app.url_map.iter_rules():
+        model = self._route_model()
+        if callable(sort) or sort in USAGE_SORT_KEYS:
+            order = model.order('rule')
+        else:
+            order = model.order(sort or 'rule')
 
-            if rule.endpoint == 'static':
+        links = []
+        for i in order:
+            props = self._props(model.routes[i], groups_to_generate,
+                                truncate=truncate)
+            if props is not None:
+                links.append(props)
+        self._add_usage(links)
+        self._add_profiled(links)
+        if callable(sort):
+            return sort(links)
+        if sort in USAGE_SORT_KEYS:
+            if self.stats is None:
+                raise ValueError('Sorting by %r requires stats' % sort)
+            links.sort(key=USAGE_SORT_KEYS[sort])
+        return links
+
+    def detail(self, key, groups='all'):
+        """Return the dict of generate() for the route identified by key
+        (refer to route_key()), or None if there is no such route in groups
+        """
+        groups_to_generate = groups if type(groups) is list else [groups]
+        model = self._route_model()
+        i = model.index(key)
+        if i is None:
+            return None
+        props = self._props(model.routes[i], groups_to_generate)
+        if props is not None:
+            self._add_usage([props])
+            self._add_profiled([props])
+        return props
+
+    def _usage_state(self, groups):
+        """Return the number of requests to each endpoint documented in
+        groups, which changes whenever their usage stats change"""
+        summary = self.stats.summary()
+        return sorted((endpoint, summary[endpoint]['hits'])
+                      for endpoint in self._route_model().endpoints(
+                          self.func_groups, groups)
+                      if endpoint in summary)
+
+    def _add_usage(self, links):
+        """Add the usage stats of their endpoint to dicts of generate()"""
+        if self.stats is None:
+            return
+        summary = self.stats.summary()
+        for props in links:
+            usage = summary.get(props['endpoint'])
+            props['hits'] = usage['hits'] if usage else 0
+            props['latency'] = usage['latency'] if usage else None
+            props['histogram'] = usage['histogram'] if usage else []
+
+    def _props(self, model_route, groups, truncate=False):
+        """Return the dict of generate() for a route of the _RouteModel, or
+        None if it does not belong to any of groups"""
+        func, route = model_route
+        func_groups = self.func_groups.get(func, ())
+        if not func_groups or not func_groups.intersection(groups):
+            return None
+        props = dict(route)
+        func_props = self.func_props.get(func, {})
+        for p in func_props:
+            if p not in self.immutable_props:
+                props[p] = func_props[p]
+        if truncate:
+            max_size = self.func_max_sizes.get(func, self.max_size)
+            truncated = []
+            for field, size in _oversized(props, func_props, max_size,
+                                           self.immutable_props):
+                if isinstance(props[field], str):
+                    props[field] = props[field][:max_size]
+                    truncated.append(field)
+            if truncated:
+                props['truncated'] = sorted(truncated)
+        return props
+
+    def budget_report(self, groups='all'):
+        """Return the docstrings and properties of the routes specified by
+        the doc() method which exceed their max_size, biggest first
+
+        Each item is a dict with the key of the route (refer to route_key()),
+        the field, its size and the max_size. The size of properties that are
+        not strings is the length of their json serialization; they are
+        reported but never truncated by generate().
+        """
+        report = []
+        for props in self.generate(groups=groups, truncate=False):
+            func = unwrap(current_app.view_functions[props['endpoint']])
+            max_size = self.func_max_sizes.get(func, self.max_size)
+            func_props = self.func_props.get(func, {})
+            for field, size in _oversized(props, func_props, max_size,
+                                           self.immutable_props):
+                report.append({
+                    'key': route_key(props),
+                    'field': field,
+                    'size': size,
+                    'max_size': max_size,
+                })
+        report.sort(key=lambda item: (-item['size'], item['key']))
+        return report
+
+    def _add_profiled(self, links):
+        """Tell dicts of generate() whether their endpoint is profiled"""
+        if not self.profilers:
+            return
+        for props in links:
+            props['profiled'] = props['endpoint'] in self.profilers
+
+    def profile(self, groups=None, endpoints=None, sample=1):
+        """Start profiling the view functions of the current app that
+        belong to any of groups or whose endpoint is in endpoints
+
+        The view functions are replaced with EndpointProfiler wrappers,
+        which profile one call in sample with cProfile. While endpoints are
+        profiled, dicts of generate() contain 'profiled', and the default
+        template links them to profile_url (given to html()), which should
+        return profile_response() for the 'endpoint' query argument.
+
+        Return the list of newly profiled endpoints. Raise ValueError if
+        sample is lower than 1.
+        """
+        if sample < 1:
+            raise ValueError('sample must be at least 1, not %r' % sample)
+        if type(groups) is str:
+            groups = [groups]
+        groups = set(groups or ())
+        endpoints = set(endpoints or ())
+        profiled = []
+        for endpoint, func in list(current_app.view_functions.items()):
+            if endpoint in self.profilers:
                 continue
-
-            func = current_app.view_functions[rule.endpoint]
-            arguments = rule.arguments if rule.arguments else ['None']
-            func_groups = self.func_groups[func]
-            func_props = self.func_props[func] if func in self.func_props \
-                else {}
-            location = self.func_locations.get(func, None)
-
-            if func_groups.intersection(groups_to_generate):
-                props = dict(
+            if endpoint not in endpoints and \
+                    not groups.intersection(self.func_groups.get(func, ())):
+                continue
+            profiler = EndpointProfiler(func, sample=sample)
+            current_app.view_functions[endpoint] = profiler
+            self.profilers[endpoint] = profiler
+            profiled.append(endpoint)
+        return sorted(profiled)
+
+    def unprofile(self, endpoints=None):
+        """Stop profiling the given endpoints of the current app, or all of
+        them, restoring their view functions and dropping their profiles"""
+        if endpoints is None:
+            endpoints = list(self.profilers)
+        for endpoint in endpoints:
+            profiler = self.profilers.pop(endpoint, None)
+            if profiler is not None and \
+                    current_app.view_functions.get(endpoint) is profiler:
+                current_app.view_functions[endpoint] = profiler.func
+
+    def profile_response(self, endpoint):
+        """Return the profiles of endpoint as a downloadable .pstats file,
+        to be loaded with pstats.Stats
+
+        Aborts with 404 if the endpoint is not profiled or was not called
+        yet.
+        """
+        profiler = self.profilers.get(endpoint)
+        data = profiler.dump() if profiler is not None else None
+        if data is None:
+            abort(404)
+        rv = current_app.response_class(
+            data, mimetype='application/octet-stream')
+        rv.headers['Content-Disposition'] = \
+            'attachment; filename="%s.pstats"' % endpoint
+        return rv
+
+    def _route_signature(self):
+        """Return a cheap value that changes whenever routes are added or
+        doc() is called"""
+        return (
+            id(current_app._get_current_object()),
+            len(current_app.view_functions),
+            len(current_app.url_map._rules),
+            self._revision,
+        )
+
+    def _route_model(self):
+        """Return the _RouteModel of the current app, building it if the
+        routes changed since it was last built"""
+        signature = self._route_signature()
+        if self._model is None or self._model.signature != signature:
+            routes = []
+            locations = {}
+            for rule in current_app.url_map.iter_rules():
+                if rule.endpoint == 'static':
+                    continue
+                func = unwrap(current_app.view_functions[rule.endpoint])
+                location = self.func_locations.get(func, None)
+                if location is not None and location not in locations:
+                    locations[location] = dict(filename=location[0],
+                                               line=location[1])
+                routes.append((func, dict(
                     methods=rule.methods,
                     rule="%s" % rule,
                     endpoint=rule.endpoint,
                     docstring=func.__doc__,
-                    args=arguments,
+                    args=rule.arguments if rule.arguments else ['None'],
                     defaults=rule.defaults,
-                    location=location,
-                )
-                for p in func_props:
-                    if p not in self.immutable_props:
-                        props[p] = func_props[p]
-                links.append(props)
-        if sort:
-            return sort(links)
-        else:
-            return sorted(links, key=itemgetter('rule'))
-
-    def html(self, groups='all', template=None, **context):
+                    location=locations.get(location),
+                )))
+            self._model = _RouteModel(signature, routes, self.func_groups)
+        return self._model
+
+    def version(self):
+        """Return a hash of everything the documentation is built from
+
+        The hash covers the route table of the current app along with the
+        groups, properties and docstrings of the view functions, and is the
+        same in every process serving the same code. It is computed once per
+        route table, so checking it again is cheap.
+        """
+        model = self._route_model()
+        if model.fingerprint is None:
+            h = hashlib.sha1()
+            for i in model.order('rule'):
+                func, route = model.routes[i]
+                h.update(_canonical([
+                    route['rule'],
+                    route['endpoint'],
+                    route['methods'],
+                    route['defaults'],
+                    route['docstring'],
+                    self.func_groups.get(func, ()),
+                    dict(self.func_props.get(func, {})),
+                    self.func_max_sizes.get(func, self.max_size),
+                ]).encode('utf-8'))
+            model.fingerprint = h.hexdigest()
+        return model.fingerprint
+
+    def snapshot(self, groups='all'):
+        """Return a json serializable description of the routes specified
+        by the doc() method, to be compared later with diff()
+
+        The snapshot maps a key made of the rule and endpoint of each route
+        to its record (the dict of generate(), without the location and
+        usage stats) and a hash of that record.
+        """
+        routes = {}
+        for doc in self.generate(groups=groups, truncate=False):
+            record = dict((k, v) for k, v in doc.items()
+                          if k not in SNAPSHOT_EXCLUDED_PROPS)
+            record = _canonical(record)
+            routes[route_key(doc)] = {
+                'hash': hashlib.sha1(record.encode('utf-8')).hexdigest(),
+                'route': json.loads(record),
+            }
+        return {'version': self.version(), 'routes': routes}
+
+    def diff(self, snapshot, groups='all'):
+        """Return the differences between a snapshot() and the current
+        routes (refer to diff_snapshots())"""
+        return diff_snapshots(snapshot, self.snapshot(groups=groups))
+
+    def html(self, groups='all', template=None, sort=None, **context):
         """Return an html string of the routes specified by the doc() method
 
         A template can be specified. A list of routes is available under the
@@ -174,21 +578,376 @@ class Autodoc(object):
         default template is used.
 
         By specifying the group or groups arguments, only routes belonging to
-        those groups will be returned.
+        those groups will be returned. sort is passed down to generate().
+
+        If a shared_cache file was given to the constructor, the rendered
+        html is stored in that file and served from it by every process
+        using the same file, until the route table changes.
+
+        The default template is compiled once per process. If a
+        bytecode_cache (a directory or a jinja2.BytecodeCache) was given to
+        the constructor, the compiled default and custom templates are also
+        stored there, so that new processes do not compile them again.
+        """
+        if 'autodoc' in context:
+            return self._render_html(groups, template, sort, context)
+        return self._shared(
+            'html', [groups, template, sort, context],
+            lambda: self._render_html(groups, template, sort, context))
+
+    def json(self, groups='all', sort=None):
+        """Return a json string of the routes specified by the doc() method
+
+        The json holds the list returned by generate(), with sets turned
+        into sorted lists. Like html(), it goes through the shared_cache.
+        """
+        return self._shared(
+            'json', [groups, sort],
+            lambda: _canonical(self.generate(groups=groups, sort=sort)))
+
+    def response(self, groups='all', format='html', max_age=0, public=False,
+                 **kwargs):
+        """Return a response with the html() or json() (depending on format)
+        of the routes specified by the doc() method
+
+        The response carries an ETag derived from version() and a
+        Cache-Control header allowing clients to keep it for max_age seconds.
+        Conditional requests matching the current version get an empty 304
+        response without any documentation being rendered.
+
+        The response is only marked as public, allowing shared caches such
+        as proxies to store it even for authenticated requests, if public is
+        True.
+
+        No Last-Modified date is given: each process only knows when it
+        first saw the current routes, which would differ between workers.
+
+        Other arguments are passed down to html() or json().
+        """
+        if format == 'json':
+            return self._conditional(
+                [groups, format, kwargs], groups, max_age, public,
+                'application/json', lambda: self.json(groups=groups, **kwargs))
+        elif format == 'html':
+            return self._conditional(
+                [groups, format, kwargs], groups, max_age, public,
+                'text/html', lambda: self.html(groups=groups, **kwargs))
+        raise ValueError('Unknown format: %r' % format)
+
+    def detail_response(self, key, groups='all', max_age=0, public=False):
+        """Return a json response with the detail() of a route, with the
+        same caching headers as response()
+
+        Details are read from the in-process route model and never stored in
+        the shared_cache, which is rewritten on every new entry.
+
+        This is what the default template fetches when it is given a
+        detail_url; the key is expected in the 'key' query argument:
+
+            @app.route('/doc/detail')
+            def doc_detail():
+                return auto.detail_response(request.args.get('key'))
+
+        Aborts with 404 if there is no such route.
+        """
+        detail = self.detail(key, groups=groups)
+        if detail is None:
+            abort(404)
+        return self._conditional(
+            [groups, 'detail', key], groups, max_age, public,
+            'application/json', lambda: _canonical(detail))
+
+    def _conditional(self, args, groups, max_age, public, mimetype, render):
+        """Return a response with caching headers for the current version()
+        and args, with render() as data unless the request is conditional
+        and matches them
+
+        With stats, the documentation changes with the usage of the
+        endpoints documented in groups, so the ETag changes with it too. It
+        also changes with the set of profiled endpoints, which get a link to
+        their profile.
         """
+        if self.stats is not None:
+            args = [self._usage_state(groups), args]
+        if self.profilers:
+            args = [sorted(self.profilers), args]
+        etag = hashlib.sha1(_canonical([self.version(), args]).encode('utf-8'))
+        etag = etag.hexdigest()
+
+        rv = current_app.response_class()
+        rv.set_etag(etag)
+        if public:
+            rv.cache_control.public = True
+        rv.cache_control.max_age = max_age
+        rv.cache_control.must_revalidate = True
+        if not is_resource_modified(request.environ, etag=etag):
+            rv.status_code = 304
+            return rv
+        rv.mimetype = mimetype
+        rv.set_data(render())
+        return rv
+
+    def _shared(self, kind, args, render):
+        """Return render(), going through the shared_cache if any
+
+        The entry is keyed by kind and args. Args that cannot be serialized
+        to json (such as a sort function) would give keys differing between
+        processes, so they bypass the shared_cache.
+        """
+        if self.shared_cache is None or self.stats is not None:
+            return render()
+        try:
+            key = kind + ':' + _strict_canonical(args)
+        except (TypeError, ValueError):
+            return render()
+        if self.profilers:
+            key += ':profiled:' + _canonical(sorted(self.profilers))
+        version = self.version()
+        content = self.shared_cache.get(version, key)
+        if content is None:
+            content = render()
+            self.shared_cache.put(version, key, content.encode('utf-8'))
+            return content
+        return content.decode('utf-8')
+
+    def _render_html(self, groups, template, sort, context):
         context['autodoc'] = context['autodoc'] if 'autodoc' in context \
-            else self.generate(groups=groups)
+            else self.generate(groups=groups, sort=sort)
         context['defaults'] = context['defaults'] if 'defaults' in context \
             else self.default_props
-        if template:
+        if template and self.bytecode_cache is None:
             return render_template(template, **context)
+        app = current_app._get_current_object()
+        template = self._jinja_env(app).get_template(
+            template or DEFAULT_TEMPLATE)
+        app.update_template_context(context)
+        return template.render(context)
+
+    def _jinja_env(self, app):
+        """Return the jinja2 environment rendering the templates of autodoc
+
+        It is an overlay of the environment of app, which also finds the
+        default template and stores compiled templates in bytecode_cache.
+        """
+        env = self._jinja_envs.get(app)
+        if env is None:
+            loader = ChoiceLoader([
+                PrefixLoader({TEMPLATE_PREFIX: FileSystemLoader(
+                    os.path.join(os.path.dirname(__file__), 'templates'))}),
+                app.jinja_env.loader,
+            ])
+            env = self._jinja_envs[app] = app.jinja_env.overlay(
+                loader=loader, bytecode_cache=self.bytecode_cache)
+        return env
+
+
+def _sort_by_rule(func, route, groups):
+    return route['rule']
+
+
+def _sort_by_endpoint(func, route, groups):
+    return (route['endpoint'], route['rule'])
+
+
+def _sort_by_methods(func, route, groups):
+    return (sorted(route['methods']), route['rule'])
+
+
+def _sort_by_group(func, route, groups):
+    return (sorted(g for g in groups if g != 'all'), route['rule'])
+
+
+def _sort_by_location(func, route, groups):
+    location = route['location']
+    if location is None:
+        return (True, '', 0, route['rule'])
+    return (False, location['filename'], location['line'], route['rule'])
+
+
+SORT_KEYS = {
+    'rule': _sort_by_rule,
+    'endpoint': _sort_by_endpoint,
+    'methods': _sort_by_methods,
+    'group': _sort_by_group,
+    'location': _sort_by_location,
+}
+
+
+# The templates bundled with autodoc are found under this prefix, so that
+# they do not clash with the templates of the app.
+TEMPLATE_PREFIX = '__autodoc__'
+DEFAULT_TEMPLATE = TEMPLATE_PREFIX + '/autodoc_default.html'
+
+USAGE_SORT_KEYS = {
+    'hits': lambda props: -props['hits'],
+    'latency': lambda props: -(props['latency'] or 0),
+}
+
+SNAPSHOT_EXCLUDED_PROPS = ('location', 'hits', 'latency', 'histogram',
+                           'profiled')
+
+
+class _RouteModel(object):
+    """Routes of an app as seen by generate(), along with the orders in
+    which they can be listed
+
+    Each route is a (view function, dict) tuple where the dict holds the
+    values of generate() that come from the route table. Orders are lists of
+    indexes into routes, computed the first time they are asked for.
+    """
+
+    def __init__(self, signature, routes, func_groups):
+        self.signature = signature
+        self.routes = routes
+        self.func_groups = func_groups
+        self.fingerprint = None
+        self._orders = {}
+        self._index = None
+        self._endpoints = {}
+
+    def order(self, name):
+        if name not in self._orders:
+            if name not in SORT_KEYS:
+                raise ValueError('Unknown sort order: %r' % name)
+            key = SORT_KEYS[name]
+            routes = self.routes
+            func_groups = self.func_groups
+            self._orders[name] = sorted(
+                range(len(routes)),
+                key=lambda i: key(routes[i][0], routes[i][1],
+                                  func_groups.get(routes[i][0], ())))
+        return self._orders[name]
+
+    def endpoints(self, func_groups, groups):
+        """Return the endpoints of the routes belonging to any of groups"""
+        groups = groups if type(groups) is list else [groups]
+        key = tuple(groups)
+        if key not in self._endpoints:
+            self._endpoints[key] = frozenset(
+                route['endpoint'] for func, route in self.routes
+                if func_groups.get(func, frozenset()).intersection(groups))
+        return self._endpoints[key]
+
+    def index(self, key):
+        """Return the index of the route identified by key, or None"""
+        if self._index is None:
+            self._index = dict(
+                (route_key(route), i)
+                for i, (func, route) in enumerate(self.routes))
+        return self._index.get(key)
+
+
+def _location(frame):
+    """Return the (filename, line) of the code running in frame"""
+    return (frame.f_code.co_filename, frame.f_lineno)
+
+
+def _freeze(obj):
+    """Return a hashable equivalent of obj, keeping the types of values so
+    that for instance 1 and True are told apart
+
+    Raise TypeError if obj contains unhashable values other than dicts,
+    lists and sets.
+    """
+    if isinstance(obj, dict):
+        frozen = frozenset((_freeze(k), _freeze(v)) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        frozen = tuple(_freeze(v) for v in obj)
+    elif isinstance(obj, (set, frozenset)):
+        frozen = frozenset(_freeze(v) for v in obj)
+    else:
+        hash(obj)
+        frozen = obj
+    return (type(obj), frozen)
+
+
+def _oversized(props, func_props, max_size, immutable_props):
+    """Yield (field, size) for the docstring and custom properties of a
+    dict of generate() bigger than max_size
+
+    Custom properties named like immutable_props are ignored, as they do
+    not override the values of generate().
+    """
+    if max_size is None:
+        return
+    for field in ['docstring'] + sorted(f for f in func_props
+                                        if f != 'docstring' and
+                                        f not in immutable_props):
+        value = props.get(field)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            size = len(value)
         else:
-            filename = os.path.join(
-                os.path.dirname(__file__),
-                'templates',
-                'autodoc_default.html'
-            )
-            with open(filename) as file:
-                content = file.read()
-                with current_app.app_context():
-                    return render_template_string(content, **context)
+            size = len(_canonical(value))
+        if size > max_size:
+            yield field, size
+
+
+def _distinct(objects):
+    """Return the list of distinct objects, by identity"""
+    return list(dict((id(o), o) for o in objects).values())
+
+
+def route_key(doc):
+    """Return the key identifying a route of generate() in snapshots"""
+    return '%s %s' % (doc['rule'], doc['endpoint'])
+
+
+def diff_snapshots(old, new):
+    """Return the differences between two Autodoc.snapshot()
+
+    The result is a dict with:
+     - added: keys of the routes only in new
+     - removed: keys of the routes only in old
+     - changed: for each route whose record changed, a dict mapping each
+       changed field to its old and new values
+
+    Only the records whose hash differ are compared field by field.
+    """
+    old_routes = old['routes']
+    new_routes = new['routes']
+    changed = {}
+    for key in old_routes:
+        if key not in new_routes or \
+                old_routes[key]['hash'] == new_routes[key]['hash']:
+            continue
+        old_route = old_routes[key]['route']
+        new_route = new_routes[key]['route']
+        fields = {}
+        for field in set(old_route) | set(new_route):
+            if old_route.get(field) != new_route.get(field):
+                fields[field] = {
+                    'old': old_route.get(field),
+                    'new': new_route.get(field),
+                }
+        changed[key] = fields
+    return {
+        'added': sorted(k for k in new_routes if k not in old_routes),
+        'removed': sorted(k for k in old_routes if k not in new_routes),
+        'changed': changed,
+    }
+
+
+def _json_default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return repr(obj)
+
+
+def _canonical(obj):
+    """Serialize obj to a string that does not depend on dict or set
+    ordering"""
+    return json.dumps(obj, sort_keys=True, default=_json_default)
+
+
+def _strict_json_default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError('%r is not json serializable' % (obj,))
+
+
+def _strict_canonical(obj):
+    """Like _canonical(), but raise TypeError instead of using the repr() of
+    objects json cannot serialize"""
+    return json.dumps(obj, sort_keys=True, default=_strict_json_default)
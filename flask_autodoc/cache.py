@@ -0,0 +1,125 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class SharedCache(object):
+    """Rendered documentation shared between processes through a
+    memory-mapped file
+
+    The file starts with a header holding a magic string, the version
+    fingerprint of the route table the entries were rendered from and the
+    length of a JSON index mapping each key to the (offset, length) of its
+    payload. Entries rendered for another version are never returned.
+
+    Writers replace the whole file atomically, so readers either see the
+    previous or the new content, never a partial one.
+    """
+
+    MAGIC = b'AUTODOC1'
+    HEADER = struct.Struct('>8s40sI')
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._map = None
+        self._stat = None
+        self._index = {}
+        self._version = None
+        self._base = 0
+
+    def get(self, version, key):
+        """Return the bytes stored under key for version, or None"""
+        self._refresh()
+        if self._map is None or self._version != version:
+            return None
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._map[self._base + offset:self._base + offset + length]
+
+    def put(self, version, key, data):
+        """Store data under key for version
+
+        Entries of the same version already in the file are kept, entries of
+        any other version are dropped.
+        """
+        self._refresh()
+        entries = {}
+        if self._map is not None and self._version == version:
+            for k, (offset, length) in self._index.items():
+                start = self._base + offset
+                entries[k] = self._map[start:start + length]
+        entries[key] = data
+
+        index = {}
+        offset = 0
+        for k in sorted(entries):
+            index[k] = [offset, len(entries[k])]
+            offset += len(entries[k])
+        index_data = json.dumps(index, sort_keys=True).encode('utf-8')
+
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.autodoc-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(
+                    self.MAGIC, version.encode('ascii'), len(index_data)))
+                f.write(index_data)
+                for k in sorted(entries):
+                    f.write(entries[k])
+            _replace(tmp, self.filename)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._stat = None
+        self._index = {}
+        self._version = None
+
+    def _refresh(self):
+        """(Re)map the file if it has been replaced since last mapped"""
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            self.close()
+            return
+        stat = (st.st_ino, st.st_mtime, st.st_size)
+        if stat == self._stat:
+            return
+        self.close()
+        if st.st_size < self.HEADER.size:
+            return
+        with open(self.filename, 'rb') as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, length = self.HEADER.unpack_from(m, 0)
+            if magic != self.MAGIC:
+                raise ValueError('Not an autodoc cache file')
+            start = self.HEADER.size
+            index = json.loads(m[start:start + length].decode('utf-8'))
+            version = version.decode('ascii')
+            base = start + length
+            for offset, size in index.values():
+                if offset < 0 or size < 0 or base + offset + size > len(m):
+                    raise ValueError('Truncated autodoc cache file')
+        except (struct.error, ValueError, TypeError, AttributeError):
+            # a damaged file is a miss, and is replaced by the next put()
+            m.close()
+            self._stat = stat
+            return
+        self._index = index
+        self._version = version
+        self._base = base
+        self._stat = stat
+        self._map = m
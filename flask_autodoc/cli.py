@@ -0,0 +1,46 @@
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from .autodoc import diff_snapshots
+
+
+def make_cli(autodoc):
+    """Return the 'autodoc' command group for an Autodoc instance"""
+
+    @click.group(help='Documentation snapshots.')
+    def cli():
+        pass
+
+    @cli.command(help='Write a snapshot of the documented routes.')
+    @click.option('--group', '-g', 'groups', multiple=True,
+                  help='Group to document (default: all).')
+    @click.option('--output', '-o', type=click.File('w'), default='-',
+                  help='File to write the snapshot to (default: stdout).')
+    @with_appcontext
+    def snapshot(groups, output):
+        snapshot = autodoc.snapshot(groups=list(groups) or 'all')
+        output.write(json.dumps(snapshot, indent=2, sort_keys=True))
+        output.write('\n')
+
+    @cli.command(help='Compare a snapshot with another one, or with the '
+                      'current routes. Exits with status 1 if they differ.')
+    @click.argument('old', type=click.File('r'))
+    @click.argument('new', type=click.File('r'), required=False)
+    @click.option('--group', '-g', 'groups', multiple=True,
+                  help='Group to document (default: all).')
+    @click.pass_context
+    @with_appcontext
+    def diff(ctx, old, new, groups):
+        old = json.load(old)
+        if new is None:
+            new = autodoc.snapshot(groups=list(groups) or 'all')
+        else:
+            new = json.load(new)
+        result = diff_snapshots(old, new)
+        click.echo(json.dumps(result, indent=2, sort_keys=True))
+        if result['added'] or result['removed'] or result['changed']:
+            ctx.exit(1)
+
+    return cli
@@ -0,0 +1,73 @@
+import cProfile
+import functools
+import marshal
+import pstats
+import threading
+
+
+# Since Python 3.12 cProfile relies on sys.monitoring, which only one
+# profiler may use at a time in the whole interpreter.
+_profiling = threading.Lock()
+
+
+class EndpointProfiler(object):
+    """View function wrapper profiling the calls to the view with cProfile
+
+    One call in sample is profiled. The profiles of all calls are added up
+    into a single pstats.Stats.
+
+    Only one call is profiled at a time, across all the EndpointProfilers:
+    calls made while another one is profiled run unprofiled.
+    """
+
+    def __init__(self, func, sample=1):
+        if sample < 1:
+            raise ValueError('sample must be at least 1, not %r' % sample)
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.sample = sample
+        self.calls = 0
+        self.profiled = 0
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            sampled = not self.calls % self.sample
+        if not sampled or not _profiling.acquire(False):
+            return self.func(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiling tool is active
+                return self.func(*args, **kwargs)
+            try:
+                return self.func(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+                    self.profiled += 1
+        finally:
+            _profiling.release()
+
+    def dump(self):
+        """Return the profiles in the format of pstats.Stats.dump_stats(),
+        or None if no call was profiled yet"""
+        with self._lock:
+            if self._stats is None:
+                return None
+            return marshal.dumps(self._stats.stats)
+
+
+def unwrap(func):
+    """Return the view function wrapped by an EndpointProfiler, or func"""
+    if isinstance(func, EndpointProfiler):
+        return func.func
+    return func
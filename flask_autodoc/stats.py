@@ -0,0 +1,94 @@
+from bisect import bisect_left
+import threading
+
+
+# Upper bounds, in milliseconds, of the latency histogram buckets. A last
+# bucket counts the requests slower than the last bound.
+BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class UsageStats(object):
+    """Request counts and latency histograms, by endpoint
+
+    Each thread records into its own counters, so recording never takes a
+    lock; counters of all threads are added up when read. The counters of
+    threads that ended are folded into a single total, when counters are
+    read or a new thread starts recording.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._finished = {}
+
+    def record(self, endpoint, seconds):
+        """Count a request to endpoint which took seconds to handle"""
+        counters = getattr(self._local, 'counters', None)
+        if counters is None:
+            counters = self._local.counters = {}
+            with self._lock:
+                self._collect()
+                self._threads.append((threading.current_thread(), counters))
+        counter = counters.get(endpoint)
+        if counter is None:
+            counter = counters[endpoint] = [0, 0.0] + [0] * (len(BUCKETS) + 1)
+        counter[0] += 1
+        counter[1] += seconds
+        counter[2 + bisect_left(BUCKETS, seconds * 1000)] += 1
+
+    def summary(self):
+        """Return a dict mapping each endpoint to a dict with:
+         - hits: the number of requests
+         - latency: the mean time to handle them, in milliseconds
+         - histogram: a list of (upper bound in milliseconds, count), the
+           upper bound of the last bucket being None
+        """
+        summary = {}
+        for endpoint, total in self._totals().items():
+            summary[endpoint] = {
+                'hits': total[0],
+                'latency': total[1] * 1000 / total[0] if total[0] else None,
+                'histogram': list(zip(BUCKETS + (None,), total[2:])),
+            }
+        return summary
+
+    def hits(self):
+        """Return the total number of requests recorded"""
+        return sum(total[0] for total in self._totals().values())
+
+    def _totals(self):
+        """Return the counters of all threads added up, by endpoint"""
+        with self._lock:
+            self._collect()
+            totals = dict((endpoint, list(counter))
+                          for endpoint, counter in self._finished.items())
+            threads = list(self._threads)
+        for thread, counters in threads:
+            _add(totals, counters)
+        return totals
+
+    def _collect(self):
+        """Fold the counters of ended threads into the finished total
+
+        Must be called with the lock held.
+        """
+        alive = []
+        for thread, counters in self._threads:
+            if thread.is_alive():
+                alive.append((thread, counters))
+            else:
+                _add(self._finished, counters)
+        self._threads = alive
+
+
+def _add(totals, counters):
+    """Add counters to totals, endpoint by endpoint"""
+    for endpoint, counter in list(counters.items()):
+        counter = list(counter)
+        total = totals.get(endpoint)
+        if total is None:
+            totals[endpoint] = counter
+        else:
+            for i, value in enumerate(counter):
+                total[i] += value
@@ -1,11 +1,16 @@
 import inspect
+import json
 import os.path
+import pstats
+import shutil
+import tempfile
+import threading
 import unittest
 import sys
 import os
 
-from flask import Flask
-from flask.ext.autodoc import Autodoc
+from flask import Flask, request
+from flask.ext.autodoc import Autodoc, route_key
 
 
 class TestAutodoc(unittest.TestCase):
@@ -299,3 +304,726 @@ class TestAutodoc(unittest.TestCase):
             self.assertTrue(1 == len(self.autodoc.generate('group2')))
             self.assertFalse(1 == len(self.autodoc.generate('group3')))
 
+
+    def testSharedCache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'autodoc.cache')
+        autodoc = Autodoc(self.app, shared_cache=filename)
+        other = Autodoc(self.app, shared_cache=filename)
+
+        @self.app.route('/')
+        @autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        with self.app.app_context():
+            doc = autodoc.html(title='cached')
+            self.assertTrue(os.path.exists(filename))
+            self.assertIn('Returns a hello world message', doc)
+
+            # other processes are served the stored copy
+            version = autodoc.version()
+            other.func_groups.update(autodoc.func_groups)
+            self.assertEqual(version, other.version())
+            self.assertEqual(doc, other.html(title='cached'))
+
+            # a changed route table invalidates the stored copy
+            @self.app.route('/new')
+            @autodoc.doc()
+            def new():
+                return 'new'
+            self.assertNotEqual(version, autodoc.version())
+            self.assertIn('/new', autodoc.html(title='cached'))
+
+    def testSort(self):
+        @self.app.route('/b', methods=['POST'])
+        @self.autodoc.doc('first')
+        def a():
+            return 'a'
+
+        @self.app.route('/a')
+        @self.autodoc.doc('second')
+        def b():
+            return 'b'
+
+        with self.app.app_context():
+            def rules(doc):
+                return [d['rule'] for d in doc]
+            self.assertEqual(['/a', '/b'], rules(self.autodoc.generate()))
+            self.assertEqual(['/b', '/a'],
+                             rules(self.autodoc.generate(sort='endpoint')))
+            self.assertEqual(['/a', '/b'],
+                             rules(self.autodoc.generate(sort='methods')))
+            self.assertEqual(['/b', '/a'],
+                             rules(self.autodoc.generate(sort='group')))
+            self.assertEqual(['/b', '/a'],
+                             rules(self.autodoc.generate(sort='location')))
+            self.assertEqual(['/b', '/a'], rules(self.autodoc.generate(
+                sort=lambda links: sorted(links, key=lambda d: d['endpoint'])
+            )))
+            self.assertRaises(ValueError, self.autodoc.generate, sort='size')
+
+            @self.app.route('/0')
+            @self.autodoc.doc()
+            def c():
+                return 'c'
+            self.assertEqual(['/0', '/a', '/b'],
+                             rules(self.autodoc.generate()))
+
+    def testVersion(self):
+        @self.app.route('/')
+        @self.autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        with self.app.app_context():
+            version = self.autodoc.version()
+            self.assertEqual(version, self.autodoc.version())
+
+            @self.app.route('/other')
+            def other():
+                return 'other'
+            self.assertNotEqual(version, self.autodoc.version())
+            version = self.autodoc.version()
+
+            self.autodoc.doc('group1')(other)
+            self.assertNotEqual(version, self.autodoc.version())
+
+    def testJSON(self):
+        @self.app.route('/', methods=['GET', 'POST'])
+        @self.autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        with self.app.app_context():
+            doc = json.loads(self.autodoc.json())
+            self.assertEqual(1, len(doc))
+            self.assertEqual('/', doc[0]['rule'])
+            self.assertEqual(['GET', 'HEAD', 'OPTIONS', 'POST'],
+                             doc[0]['methods'])
+
+    def testResponse(self):
+        @self.app.route('/')
+        @self.autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        @self.app.route('/doc')
+        def doc():
+            return self.autodoc.response(max_age=60)
+
+        @self.app.route('/doc.json')
+        def doc_json():
+            return self.autodoc.response(format='json', public=True)
+
+        client = self.app.test_client()
+        rv = client.get('/doc')
+        self.assertEqual(200, rv.status_code)
+        self.assertIn(b'Returns a hello world message', rv.data)
+        self.assertIn('max-age=60', rv.headers['Cache-Control'])
+        self.assertNotIn('public', rv.headers['Cache-Control'])
+        self.assertNotIn('Last-Modified', rv.headers)
+        etag = rv.headers['ETag']
+
+        rv = client.get('/doc', headers={'If-None-Match': etag})
+        self.assertEqual(304, rv.status_code)
+        self.assertEqual(b'', rv.data)
+
+        rv = client.get('/doc.json', headers={'If-None-Match': etag})
+        self.assertEqual(200, rv.status_code)
+        self.assertEqual('application/json', rv.mimetype)
+        self.assertIn('public', rv.headers['Cache-Control'])
+        self.assertNotEqual(etag, rv.headers['ETag'])
+
+    def testSnapshotDiff(self):
+        @self.app.route('/a')
+        @self.autodoc.doc()
+        def a():
+            """A"""
+            return 'a'
+
+        @self.app.route('/b')
+        @self.autodoc.doc()
+        def b():
+            return 'b'
+
+        with self.app.app_context():
+            snapshot = json.loads(json.dumps(self.autodoc.snapshot()))
+            self.assertEqual(['/a a', '/b b'], sorted(snapshot['routes']))
+            self.assertEqual(
+                {'added': [], 'removed': [], 'changed': {}},
+                self.autodoc.diff(snapshot))
+
+        app = Flask(__name__)
+        autodoc = Autodoc(app)
+
+        @app.route('/a')
+        @autodoc.doc(status='beta')
+        def a():
+            """A"""
+            return 'a'
+
+        @app.route('/c', methods=['POST'])
+        @autodoc.doc()
+        def c():
+            return 'c'
+
+        with app.app_context():
+            diff = autodoc.diff(snapshot)
+            self.assertEqual(['/c c'], diff['added'])
+            self.assertEqual(['/b b'], diff['removed'])
+            self.assertEqual({'status': {'old': None, 'new': 'beta'}},
+                             diff['changed']['/a a'])
+
+    def testCLI(self):
+        from click.testing import CliRunner
+        from flask.cli import ScriptInfo
+
+        @self.app.route('/')
+        @self.autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'snapshot.json')
+        runner = CliRunner()
+        obj = ScriptInfo(create_app=lambda info: self.app)
+
+        rv = runner.invoke(self.app.cli, ['autodoc', 'snapshot', '-o',
+                                          filename], obj=obj)
+        self.assertEqual(0, rv.exit_code, rv.output)
+        rv = runner.invoke(self.app.cli, ['autodoc', 'diff', filename],
+                           obj=obj)
+        self.assertEqual(0, rv.exit_code, rv.output)
+
+        index.__doc__ = 'Returns a different message'
+        self.autodoc.doc()(index)
+        rv = runner.invoke(self.app.cli, ['autodoc', 'diff', filename],
+                           obj=obj)
+        self.assertEqual(1, rv.exit_code, rv.output)
+        self.assertIn('Returns a different message', rv.output)
+
+    def testDetail(self):
+        @self.app.route('/p1/<string:param1>')
+        @self.autodoc.doc()
+        def ab(param1):
+            """Returns arguments"""
+            return 'param1=%s' % param1
+
+        @self.app.route('/doc')
+        def doc():
+            return self.autodoc.html(detail_url='/doc/detail')
+
+        @self.app.route('/doc/detail')
+        def doc_detail():
+            return self.autodoc.detail_response(request.args.get('key'))
+
+        client = self.app.test_client()
+        rv = client.get('/doc')
+        self.assertIn(b'data-key="/p1/&lt;string:param1&gt; ab"', rv.data)
+        self.assertNotIn(b'Returns arguments', rv.data)
+
+        rv = client.get('/doc/detail', query_string={
+            'key': '/p1/<string:param1> ab'})
+        self.assertEqual(200, rv.status_code)
+        detail = json.loads(rv.data.decode('utf-8'))
+        self.assertEqual('Returns arguments', detail['docstring'])
+        self.assertEqual(['param1'], detail['args'])
+
+        rv = client.get('/doc/detail', query_string={'key': '/missing'})
+        self.assertEqual(404, rv.status_code)
+
+    def testStats(self):
+        autodoc = Autodoc(self.app, stats=True)
+
+        @self.app.route('/a')
+        @autodoc.doc()
+        def a():
+            return 'a'
+
+        @self.app.route('/b')
+        @autodoc.doc()
+        def b():
+            return 'b'
+
+        @self.app.route('/doc')
+        def doc():
+            return autodoc.html(sort='hits')
+
+        client = self.app.test_client()
+        for i in range(3):
+            client.get('/b')
+        client.get('/a')
+        client.get('/missing')
+
+        with self.app.app_context():
+            doc = autodoc.generate(sort='hits')
+            self.assertEqual(['/b', '/a'], [d['rule'] for d in doc])
+            self.assertEqual(3, doc[0]['hits'])
+            self.assertEqual(1, doc[1]['hits'])
+            self.assertIsInstance(doc[0]['latency'], float)
+            self.assertEqual(3, sum(c for _, c in doc[0]['histogram']))
+            self.assertNotIn('hits', autodoc.snapshot()['routes']['/a a'])
+            self.assertRaises(ValueError, self.autodoc.generate, sort='hits')
+
+        rv = client.get('/doc')
+        self.assertIn(b'3 requests', rv.data)
+
+    def testProfile(self):
+        @self.app.route('/slow')
+        @self.autodoc.doc('slow')
+        def slow():
+            """Slow endpoint"""
+            return 'slow'
+
+        @self.app.route('/fast')
+        @self.autodoc.doc()
+        def fast():
+            return 'fast'
+
+        @self.app.route('/doc')
+        def doc():
+            return self.autodoc.html(profile_url='/doc/profile')
+
+        @self.app.route('/doc/profile')
+        def doc_profile():
+            return self.autodoc.profile_response(request.args.get('endpoint'))
+
+        client = self.app.test_client()
+        with self.app.app_context():
+            self.assertEqual(['slow'], self.autodoc.profile(groups='slow'))
+            self.assertEqual(1, len(self.autodoc.generate('slow')))
+
+        self.assertEqual(404, client.get('/doc/profile?endpoint=slow')
+                         .status_code)
+        client.get('/slow')
+        client.get('/slow')
+        rv = client.get('/doc')
+        self.assertIn(b'/doc/profile?endpoint=slow', rv.data)
+        self.assertNotIn(b'/doc/profile?endpoint=fast', rv.data)
+
+        rv = client.get('/doc/profile?endpoint=slow')
+        self.assertEqual(200, rv.status_code)
+        self.assertIn('slow.pstats', rv.headers['Content-Disposition'])
+        filename = os.path.join(tempfile.mkdtemp(), 'slow.pstats')
+        self.addCleanup(shutil.rmtree, os.path.dirname(filename))
+        with open(filename, 'wb') as f:
+            f.write(rv.data)
+        stats = pstats.Stats(filename)
+        self.assertTrue(any(func[2] == 'slow' for func in stats.stats))
+
+        with self.app.app_context():
+            self.autodoc.unprofile()
+            self.assertIs(slow, self.app.view_functions['slow'])
+            self.assertNotIn('profiled', self.autodoc.generate()[0])
+
+    def testRegisterMany(self):
+        def view():
+            """Generated view"""
+            return 'view'
+
+        for i in range(3):
+            self.app.add_url_rule('/items/%d' % i, 'item%d' % i, view)
+
+        def other():
+            return 'other'
+        self.app.add_url_rule('/other', 'other', other)
+
+        self.autodoc.register_many(['item0', other], groups='bulk',
+                                   status='beta')
+        with self.app.app_context():
+            doc = self.autodoc.generate('bulk')
+            self.assertEqual(['/items/0', '/items/1', '/items/2', '/other'],
+                             [d['rule'] for d in doc])
+            self.assertTrue(all(d['status'] == 'beta' for d in doc))
+            self.assertIn(self.thisFile(), doc[0]['location']['filename'])
+            self.assertIs(self.autodoc.func_groups[view],
+                          self.autodoc.func_groups[other])
+
+            self.autodoc.doc('single')(other)
+            self.assertEqual(1, len(self.autodoc.generate('single')))
+            self.assertEqual(4, len(self.autodoc.generate('bulk')))
+
+    def testDocumentBlueprint(self):
+        from flask import Blueprint
+        blueprint = Blueprint('bp', __name__, static_folder='static')
+
+        @blueprint.route('/a')
+        def a():
+            return 'a'
+
+        @blueprint.route('/b')
+        def b():
+            return 'b'
+
+        self.autodoc.document_blueprint(blueprint, groups=['bp'])
+
+        @self.app.route('/c')
+        def c():
+            return 'c'
+
+        self.app.register_blueprint(blueprint, url_prefix='/bp')
+        with self.app.app_context():
+            doc = self.autodoc.generate('bp')
+            self.assertEqual(['bp.a', 'bp.b'], [d['endpoint'] for d in doc])
+
+    def testMemoryStats(self):
+        for i in range(10):
+            def view():
+                return 'view'
+            self.app.add_url_rule('/items/%d' % i, 'item%d' % i,
+                                  self.autodoc.doc('items', set_location=False,
+                                                   getargs={'a': 'A'})(view))
+
+        @self.app.route('/other')
+        @self.autodoc.doc('items', getargs={'a': True})
+        def other():
+            return 'other'
+
+        with self.app.app_context():
+            doc = self.autodoc.generate('items')
+            self.assertEqual(11, len(doc))
+            self.assertEqual({'a': 'A'}, doc[0]['getargs'])
+            self.assertEqual({'a': True}, doc[-1]['getargs'])
+
+        stats = self.autodoc.memory_stats()
+        self.assertEqual(11, stats['functions'])
+        self.assertEqual(2, stats['groups'])
+        self.assertEqual(1, stats['group_sets'])
+        self.assertEqual(2, stats['properties'])
+        self.assertEqual(1, stats['locations'])
+        self.assertGreater(stats['bytes'], 0)
+        if sys.version >= '3':
+            with self.assertRaises(TypeError):
+                self.autodoc.func_props[other]['getargs'] = {}
+
+    def testBytecodeCache(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        autodoc = Autodoc(self.app, bytecode_cache=directory)
+
+        @self.app.route('/')
+        @autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        with self.app.app_context():
+            doc = autodoc.html(title='cached')
+            self.assertIn('Returns a hello world message', doc)
+            self.assertIn('cached', doc)
+            self.assertEqual(1, len(os.listdir(directory)))
+
+            other = Autodoc(self.app, bytecode_cache=directory)
+            other.func_groups.update(autodoc.func_groups)
+            self.assertEqual(doc, other.html(title='cached'))
+            self.assertEqual(1, len(os.listdir(directory)))
+
+    def testMaxSize(self):
+        autodoc = Autodoc(self.app, max_size=20)
+
+        @self.app.route('/big')
+        @autodoc.doc(example='x' * 30, schema={'type': 'y' * 30})
+        def big():
+            """A docstring much longer than twenty characters"""
+            return 'big'
+
+        @self.app.route('/small')
+        @autodoc.doc(max_size=100)
+        def small():
+            """A docstring much longer than twenty characters"""
+            return 'small'
+
+        @self.app.route('/doc')
+        def doc():
+            return autodoc.html()
+
+        @self.app.route('/doc/detail')
+        def doc_detail():
+            return autodoc.detail_response(request.args.get('key'))
+
+        with self.app.app_context():
+            doc = autodoc.generate()
+            self.assertEqual('A docstring much lon', doc[0]['docstring'])
+            self.assertEqual('x' * 20, doc[0]['example'])
+            self.assertEqual({'type': 'y' * 30}, doc[0]['schema'])
+            self.assertEqual(['docstring', 'example'], doc[0]['truncated'])
+            self.assertNotIn('truncated', doc[1])
+
+            full = autodoc.detail('/big big')
+            self.assertEqual('x' * 30, full['example'])
+            self.assertNotIn('truncated', full)
+
+            report = autodoc.budget_report()
+            self.assertEqual(
+                [('docstring', 46), ('schema', 42), ('example', 30)],
+                [(r['field'], r['size']) for r in report])
+            self.assertEqual(set(['/big big']), set(r['key'] for r in report))
+            self.assertEqual(set([20]), set(r['max_size'] for r in report))
+
+        client = self.app.test_client()
+        rv = client.get('/doc')
+        self.assertIn(b'A docstring much lon&hellip;', rv.data)
+
+    def testResponseAcrossWorkers(self):
+        def worker(docstring):
+            app = Flask(__name__)
+            autodoc = Autodoc(app)
+
+            @app.route('/')
+            @autodoc.doc()
+            def index():
+                return 'Hello World!'
+            index.__doc__ = docstring
+
+            @app.route('/doc')
+            def doc():
+                return autodoc.response()
+            return app.test_client()
+
+        v1 = worker('Version 1')
+        v2 = worker('Version 2')
+        rv = v1.get('/doc')
+        etag = rv.headers['ETag']
+
+        rv = v2.get('/doc', headers={
+            'If-None-Match': etag,
+            'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT',
+        })
+        self.assertEqual(200, rv.status_code)
+        self.assertIn(b'Version 2', rv.data)
+
+        rv = v2.get('/doc', headers={
+            'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+        self.assertEqual(200, rv.status_code)
+
+    def testProfileInvalidatesCaches(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        autodoc = Autodoc(self.app, shared_cache=os.path.join(directory, 'c'))
+
+        @self.app.route('/slow')
+        @autodoc.doc()
+        def slow():
+            return 'slow'
+
+        @self.app.route('/doc')
+        def doc():
+            return autodoc.response(profile_url='/doc/profile')
+
+        client = self.app.test_client()
+        rv = client.get('/doc')
+        etag = rv.headers['ETag']
+        self.assertNotIn(b'Download profile', rv.data)
+
+        with self.app.app_context():
+            autodoc.profile(endpoints=['slow'])
+        rv = client.get('/doc', headers={'If-None-Match': etag})
+        self.assertEqual(200, rv.status_code)
+        self.assertIn(b'Download profile', rv.data)
+        self.assertIn(b'Download profile', client.get('/doc').data)
+
+        with self.app.app_context():
+            autodoc.unprofile()
+        rv = client.get('/doc', headers={'If-None-Match': etag})
+        self.assertEqual(304, rv.status_code)
+        self.assertNotIn(b'Download profile', client.get('/doc').data)
+
+    def testProfileOneCallAtATime(self):
+        from flask_autodoc import profiling
+
+        def view():
+            return 'view'
+        profiler = profiling.EndpointProfiler(view)
+
+        self.assertEqual('view', profiler())
+        with profiling._profiling:
+            self.assertEqual('view', profiler())
+        self.assertEqual(2, profiler.calls)
+        self.assertEqual(1, profiler.profiled)
+
+    def testStatsThreads(self):
+        from flask_autodoc.stats import UsageStats
+        stats = UsageStats()
+
+        for i in range(50):
+            thread = threading.Thread(target=stats.record,
+                                      args=('index', 0.002))
+            thread.start()
+            thread.join()
+        stats.record('index', 0.002)
+
+        summary = stats.summary()
+        self.assertEqual(51, summary['index']['hits'])
+        self.assertEqual(51, stats.hits())
+        self.assertEqual(1, len(stats._threads))
+
+    def testMaxSizeImmutableProps(self):
+        autodoc = Autodoc(self.app, max_size=5)
+
+        @self.app.route('/a_long_rule')
+        @autodoc.doc(rule='x', endpoint='y')
+        def a_long_endpoint():
+            return 'a'
+
+        with self.app.app_context():
+            doc = autodoc.generate()
+            self.assertEqual('/a_long_rule', doc[0]['rule'])
+            self.assertEqual('a_long_endpoint', doc[0]['endpoint'])
+            self.assertNotIn('truncated', doc[0])
+            self.assertEqual([], autodoc.budget_report())
+            self.assertIsNotNone(autodoc.detail(route_key(doc[0])))
+
+    def testDetailNotShared(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'autodoc.cache')
+        autodoc = Autodoc(self.app, shared_cache=filename)
+
+        @self.app.route('/a')
+        @autodoc.doc()
+        def a():
+            """A"""
+            return 'a'
+
+        @self.app.route('/doc/detail')
+        def doc_detail():
+            return autodoc.detail_response(request.args.get('key'))
+
+        rv = self.app.test_client().get('/doc/detail',
+                                        query_string={'key': '/a a'})
+        self.assertEqual('A', json.loads(rv.data.decode('utf-8'))['docstring'])
+        self.assertFalse(os.path.exists(filename))
+
+    def testSharedCacheDamaged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'autodoc.cache')
+        autodoc = Autodoc(self.app, shared_cache=filename)
+
+        @self.app.route('/')
+        @autodoc.doc()
+        def index():
+            """Returns a hello world message"""
+            return 'Hello World!'
+
+        with self.app.app_context():
+            doc = autodoc.html()
+            with open(filename, 'rb') as f:
+                content = f.read()
+            with open(filename, 'wb') as f:
+                f.write(content[:70])
+
+            other = Autodoc(self.app, shared_cache=filename)
+            other.func_groups.update(autodoc.func_groups)
+            self.assertEqual(doc, other.html())
+            # the damaged file was replaced
+            self.assertEqual(len(content), os.path.getsize(filename))
+
+    def testSharedCacheUnserializableKey(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'autodoc.cache')
+        autodoc = Autodoc(self.app, shared_cache=filename)
+
+        @self.app.route('/')
+        @autodoc.doc()
+        def index():
+            return 'Hello World!'
+
+        with self.app.app_context():
+            autodoc.json(sort=lambda links: links)
+            autodoc.html(title=object())
+            self.assertFalse(os.path.exists(filename))
+            autodoc.json()
+            self.assertTrue(os.path.exists(filename))
+
+    def testStatsResponse(self):
+        autodoc = Autodoc(self.app, stats=True)
+
+        @self.app.route('/a')
+        @autodoc.doc('public')
+        def a():
+            return 'a'
+
+        @self.app.route('/b')
+        @autodoc.doc('private')
+        def b():
+            return 'b'
+
+        @self.app.route('/doc.json')
+        def doc_json():
+            return autodoc.response(groups='public', format='json')
+
+        client = self.app.test_client()
+        etag = client.get('/doc.json').headers['ETag']
+        rv = client.get('/doc.json', headers={'If-None-Match': etag})
+        self.assertEqual(304, rv.status_code)
+
+        client.get('/b')
+        rv = client.get('/doc.json', headers={'If-None-Match': etag})
+        self.assertEqual(304, rv.status_code)
+
+        client.get('/a')
+        rv = client.get('/doc.json', headers={'If-None-Match': etag})
+        self.assertEqual(200, rv.status_code)
+        self.assertEqual(1, json.loads(rv.data.decode('utf-8'))[0]['hits'])
+
+    def testProfileSample(self):
+        @self.app.route('/a')
+        @self.autodoc.doc()
+        def a():
+            return 'a'
+
+        with self.app.app_context():
+            self.assertRaises(ValueError, self.autodoc.profile,
+                              endpoints=['a'], sample=0)
+            self.assertIs(a, self.app.view_functions['a'])
+            self.assertEqual({}, self.autodoc.profilers)
+
+    def testRegisterManyProfiled(self):
+        def b():
+            return 'b'
+        self.app.add_url_rule('/b', 'b', b)
+
+        with self.app.app_context():
+            self.autodoc.profile(endpoints=['b'])
+            self.autodoc.register_many(['b'], groups='bulk')
+            self.assertEqual(['/b'], [d['rule'] for d in
+                                      self.autodoc.generate('bulk')])
+
+    def testInternedPropsKeyTypes(self):
+        @self.app.route('/a')
+        @self.autodoc.doc(codes={1: 'ok'})
+        def a():
+            return 'a'
+
+        @self.app.route('/b')
+        @self.autodoc.doc(codes={True: 'ok'})
+        def b():
+            return 'b'
+
+        with self.app.app_context():
+            doc = self.autodoc.generate()
+            self.assertIs(int, type(list(doc[0]['codes'])[0]))
+            self.assertIs(bool, type(list(doc[1]['codes'])[0]))
+
+    def testTemplateUrlsWithQuery(self):
+        @self.app.route('/a')
+        @self.autodoc.doc()
+        def a():
+            return 'a'
+
+        with self.app.app_context():
+            self.autodoc.profile(endpoints=['a'])
+            doc = self.autodoc.html(detail_url='/detail?v=1',
+                                    profile_url='/profile?v=1')
+        self.assertIn('/profile?v=1&amp;endpoint=a', doc)
+        self.assertIn("url.indexOf('?')", doc)